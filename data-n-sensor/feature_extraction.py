@@ -121,6 +121,9 @@ def main():
     ]), "Missing required features"
     print("\n✅ FEATURE EXTRACTION COMPLETE — 6 high-value features ready for XAI layer")
 
+    # Returned so in-process callers can skip re-reading the JSON file
+    return features
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,52 @@
+"""
+Embedding server - keeps one SentenceTransformer loaded in a daemon process.
+
+The pipeline normally reloads the embedding model on every cold start
+(~seconds of weight reads). Running this server once lets any number of
+workflow invocations reuse the warm model over a local socket.
+
+Usage:
+    python pipeline_logic/embedding_server.py          # start the daemon
+    EMBEDDING_SERVER=1 python run_full_pipeline.py      # clients opt in
+"""
+
+import os
+import numpy as np
+from multiprocessing.connection import Listener, Client
+
+ADDRESS = ('localhost', 6100)
+AUTHKEY = b'mt-llm-embeddings'
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+class RemoteEncoder:
+    """Drop-in replacement for the encode() side of SentenceTransformer."""
+
+    def __init__(self, address=ADDRESS):
+        self._conn = Client(address, authkey=AUTHKEY)
+
+    def encode(self, texts, **kwargs):
+        self._conn.send((texts, kwargs))
+        return np.asarray(self._conn.recv())
+
+
+def serve(address=ADDRESS):
+    from sentence_transformers import SentenceTransformer
+
+    print(f"Loading embedding model: {MODEL_NAME}...")
+    model = SentenceTransformer(MODEL_NAME)
+    print(f"Embedding server listening on {address}")
+
+    with Listener(address, authkey=AUTHKEY) as listener:
+        while True:
+            conn = listener.accept()
+            try:
+                while True:
+                    texts, kwargs = conn.recv()
+                    conn.send(model.encode(texts, **kwargs))
+            except (EOFError, ConnectionResetError):
+                conn.close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,32 +1,199 @@
+import atexit
 import json
 import datetime
+import functools
 import os
+import queue
 import sys
+import threading
 import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 
+# Faster C-implemented JSON when available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Add trace-engine to path for threshold adjuster
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'trace-engine'))
 
 # Constants
 MODEL_NAME = "google/flan-t5-small"
-LOG_FILE = "interaction_logs.json"
+DRAFT_MODEL_NAME = "google/flan-t5-small"  # Draft model for speculative decoding
+LOG_FILE = "interaction_logs.jsonl"
+LEGACY_LOG_FILE = "interaction_logs.json"
 input_file = "final_recommendation.json"
 
+class LogWriter:
+    """
+    Buffered log writer: entries go into a bounded queue and a daemon
+    thread batches them into single writes, so alert processing never
+    blocks on disk I/O during bursts.
+
+    Rejected-feedback lines also get their byte offset appended to a
+    sidecar index (<log>.rej.idx, 8-byte little-endian offsets) so the
+    threshold adjuster can seek straight to the latest rejection.
+    """
+
+    def __init__(self, log_file, maxsize=4096, batch_size=256):
+        self.log_file = log_file
+        self.index_file = os.path.splitext(log_file)[0] + '.rej.idx'
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def put(self, line, is_rejection=False):
+        self._queue.put((line, is_rejection))
+
+    def flush(self):
+        self._queue.join()
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.log_file, 'ab', buffering=1 << 16) as f:
+                    offset = f.tell()
+                    rejection_offsets = []
+                    parts = []
+                    for line, is_rejection in batch:
+                        if is_rejection:
+                            rejection_offsets.append(offset)
+                        offset += len(line)
+                        parts.append(line)
+                    f.write(b''.join(parts))
+                if rejection_offsets:
+                    with open(self.index_file, 'ab') as idx:
+                        idx.write(b''.join(off.to_bytes(8, 'little') for off in rejection_offsets))
+            except OSError as e:
+                print(f"Log write failed: {e}")
+            for _ in batch:
+                self._queue.task_done()
+
+
+@functools.lru_cache(maxsize=256)
+def _humanize_key(key):
+    """Cached 'feature_name' -> 'Feature name' formatting (small key set,
+    recomputed for every trace otherwise)."""
+    return key.replace("_", " ").capitalize()
+
+
+_log_writer = None
+
+def get_log_writer():
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = LogWriter(LOG_FILE)
+        # Callers never flush per entry (that would re-block the hot path
+        # on disk); drain whatever is still queued at interpreter exit
+        atexit.register(_log_writer.flush)
+    return _log_writer
+
+
 class MachineExplainer:
     def __init__(self, model_name=MODEL_NAME):
         print(f"Loading model: {model_name}...")
+        # Use GPU if available
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+            load_kwargs = {}
+            if self.device == "cuda":
+                # bf16 halves the weight bytes read per decoded token
+                load_kwargs["torch_dtype"] = torch.bfloat16
+            try:
+                # Fused scaled-dot-product attention: attention scores are
+                # never materialized, cutting memory traffic during decode
+                self.model = AutoModelForSeq2SeqLM.from_pretrained(
+                    model_name, attn_implementation="sdpa", **load_kwargs
+                )
+            except (TypeError, ValueError):
+                # Older transformers without the sdpa kwarg
+                self.model = AutoModelForSeq2SeqLM.from_pretrained(
+                    model_name, **load_kwargs
+                )
         except Exception as e:
             print(f"FAILED TO LOAD MODEL: {e}")
             raise e
-        
-        # Use GPU if available
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+        # Pre-tokenize the constant template halves once
+        self._prefix_ids = self.tokenizer(PROMPT_PREFIX, add_special_tokens=False).input_ids
+        self._suffix_ids = self.tokenizer(PROMPT_SUFFIX, add_special_tokens=False).input_ids
+
         self.model.to(self.device)
-        print(f"Model loaded on {self.device}.")
+        self.backend = "torch"
+
+        if self.device == "cpu":
+            # Prefer ONNX Runtime on CPU: graph fusion avoids the
+            # Python-level op dispatch of the eager path (~2-4x on CPU)
+            onnx_model = self._try_load_onnx(model_name)
+            if onnx_model is not None:
+                self.model = onnx_model
+                self.backend = "onnx"
+                print("Using ONNX Runtime backend for CPU inference.")
+            else:
+                # Dynamic INT8 quantization of the Linear layers: ~4x smaller
+                # weights and faster matmuls on the CPU path
+                try:
+                    self.model = torch.quantization.quantize_dynamic(
+                        self.model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+                    print("Applied dynamic INT8 quantization for CPU inference.")
+                except Exception as e:
+                    print(f"Quantization skipped: {e}")
+
+        # Speculative decoding: a small draft model proposes tokens that the
+        # main model verifies in one forward pass (2-3x on templated prompts).
+        # Only worth loading when the main model is bigger than the draft.
+        self.draft = None
+        if self.backend == "torch" and model_name != DRAFT_MODEL_NAME:
+            try:
+                self.draft = AutoModelForSeq2SeqLM.from_pretrained(DRAFT_MODEL_NAME)
+                self.draft.to(self.device)
+                print(f"Loaded draft model for speculative decoding: {DRAFT_MODEL_NAME}")
+            except Exception as e:
+                print(f"Draft model unavailable, decoding without it: {e}")
+                self.draft = None
+
+        if self.device == "cuda":
+            # torch.compile with CUDA-graph capture cuts per-token kernel
+            # launch overhead on the fixed-shape decode step
+            try:
+                self.model = torch.compile(self.model, mode="reduce-overhead")
+                print("Compiled model with torch.compile (reduce-overhead).")
+            except Exception as e:
+                print(f"torch.compile unavailable, using eager mode: {e}")
+
+        print(f"Model loaded on {self.device} (backend: {self.backend}).")
+
+    def _try_load_onnx(self, model_name):
+        """
+        Export the model to ONNX once (cached under ./cache/) and load it
+        with ONNX Runtime. Returns None when optimum/onnxruntime are not
+        installed so the caller can fall back to the PyTorch path.
+        """
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError:
+            return None
+
+        cache_dir = os.path.join("cache", model_name.split("/")[-1] + "-onnx")
+        try:
+            if os.path.isdir(cache_dir):
+                return ORTModelForSeq2SeqLM.from_pretrained(cache_dir)
+            model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+            model.save_pretrained(cache_dir)
+            return model
+        except Exception as e:
+            print(f"ONNX export failed, falling back to PyTorch: {e}")
+            return None
 
     def _humanize_decision_trace(self, trace):
         observations = []
@@ -34,7 +201,7 @@ class MachineExplainer:
         # 1. Handle REASONING TRACE (Specific Rules Schema)
         if "reasoning_trace" in trace:
             for step in trace["reasoning_trace"]:
-                feature = step.get("feature", "Unknown Feature").replace("_", " ").capitalize()
+                feature = _humanize_key(step.get("feature", "Unknown Feature"))
                 val = step.get("feature_value", 0)
                 threshold = step.get("threshold", "N/A")
                 comparison = step.get("comparison", "vs")
@@ -51,7 +218,7 @@ class MachineExplainer:
                 if key in ["reasoning_trace", "rules_triggered", "final_confidence"]: 
                     continue # Skip redundant keys if mixed
                     
-                formatted_key = key.replace("_", " ").capitalize()
+                formatted_key = _humanize_key(key)
                 
                 if isinstance(value, list):
                     if value:
@@ -106,40 +273,59 @@ class MachineExplainer:
             
         print(f"\n[INFO] Knowledge Base updated with new chunk: {new_id}")
 
-    def generate_explanation(self, decision_trace):
+    def _recommendation_text(self, decision_trace):
         # Extract recommendations specifically from the final_recommendation.json structure
         recommendations = decision_trace.get("recommended_action", [])
         if isinstance(recommendations, list):
-            rec_text = "\n".join(rec for rec in recommendations if isinstance(rec, str))
-        else:
-            rec_text = str(recommendations)
-
-        prompt = f"""
-Task: Generate a detailed maintenance explanation based on the actions given in the {input_file}.
-Rules:
-- Summarise the actions of each condition 
-- clearly mention all the actions and do NOT miss anything
-- Another thing to add is do NOT repeat a sentence or action.
+            return "\n".join(rec for rec in recommendations if isinstance(rec, str))
+        return str(recommendations)
 
-Maintenance Actions:
-{rec_text}
+    def _encode_prompts(self, decision_traces):
+        """
+        Tokenize only the dynamic recommendation text per trace and splice it
+        between the pre-tokenized template halves — ~80% of the prompt is
+        identical on every call and never re-runs through the tokenizer.
+        """
+        budget = max(self.tokenizer.model_max_length
+                     - len(self._prefix_ids) - len(self._suffix_ids) - 1, 32)
+        seqs = []
+        for trace in decision_traces:
+            dyn_ids = self.tokenizer(
+                self._recommendation_text(trace),
+                add_special_tokens=False, truncation=True, max_length=budget
+            ).input_ids
+            seqs.append(self._prefix_ids + dyn_ids + self._suffix_ids
+                        + [self.tokenizer.eos_token_id])
+        return self.tokenizer.pad({"input_ids": seqs}, return_tensors="pt")
 
-Detailed Explanation:
-"""
-        inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True).to(self.device)
+    def generate_explanations(self, decision_traces):
+        """
+        Generate explanations for a batch of traces in a single forward pass.
+        Batch=1 generate is memory-bound (the model weights are re-read per
+        alert), so batching many alerts through one generate() call amortizes
+        that cost.
+        """
+        inputs = self._encode_prompts(decision_traces).to(self.device)
 
-        outputs = self.model.generate(
-            **inputs,
+        gen_kwargs = dict(
             max_length=500,
             min_length=50,
-            do_sample=True,
-            temperature=0.1,  # Lower temp for more deterministic/focused output
-            top_p=0.9,
+            do_sample=False,  # Greedy decode: deterministic, skips sampling kernels
+            num_beams=1,
             repetition_penalty=2.0, # High penalty for repetition
         )
+        # Assisted generation only supports batch size 1
+        if self.draft is not None and len(decision_traces) == 1:
+            gen_kwargs["assistant_model"] = self.draft
+
+        outputs = self.model.generate(**inputs, **gen_kwargs)
 
-        explanation = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return explanation.strip()
+        decoded = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        return [text.strip() for text in decoded]
+
+    def generate_explanation(self, decision_trace):
+        # Single-trace convenience wrapper around the batched path
+        return self.generate_explanations([decision_trace])[0]
 
     def log_interaction(self, input_trace, output_explanation, user_feedback=None):
         log_entry = {
@@ -149,27 +335,72 @@ Detailed Explanation:
             "user_feedback": user_feedback
         }
 
-        # Append to existing log file or create new one
-        if os.path.exists(LOG_FILE):
-            try:
-                with open(LOG_FILE, 'r') as f:
-                    logs = json.load(f)
-                    if not isinstance(logs, list):
-                        logs = []
-            except (json.JSONDecodeError, ValueError):
-                logs = []
+        # Append-only JSON Lines via the buffered background writer: the
+        # hot path only enqueues; batching + disk writes happen off-thread
+        writer = get_log_writer()
+        if orjson is not None:
+            line = orjson.dumps(log_entry) + b'\n'
         else:
-            logs = []
-
-        logs.append(log_entry)
+            line = json.dumps(log_entry, separators=(',', ':')).encode() + b'\n'
+        writer.put(line, is_rejection=(user_feedback == 'Rejected'))
 
-        with open(LOG_FILE, 'w') as f:
-            json.dump(logs, f, indent=4)
-        
         print(f"Interaction logged to {LOG_FILE}")
 
+
+def read_logs(log_file=LOG_FILE):
+    """Read all interaction log entries (legacy JSON array + JSONL lines)."""
+    logs = []
+
+    # Entries written before the JSONL switch live in the old array file
+    if os.path.exists(LEGACY_LOG_FILE):
+        try:
+            with open(LEGACY_LOG_FILE, 'r') as f:
+                legacy = json.load(f)
+                if isinstance(legacy, list):
+                    logs.extend(legacy)
+        except (json.JSONDecodeError, ValueError):
+            pass
+
+    if os.path.exists(log_file):
+        with open(log_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    logs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+
+    return logs
+
 INPUT_FILE = "final_recommendation.json"
 
+# Static halves of the prompt template, split around the dynamic
+# recommendation text so they can be tokenized once at init
+PROMPT_PREFIX = f"""
+Task: Generate a detailed maintenance explanation based on the actions given in the {input_file}.
+Rules:
+- Summarise the actions of each condition
+- clearly mention all the actions and do NOT miss anything
+- Another thing to add is do NOT repeat a sentence or action.
+
+Maintenance Actions:
+"""
+PROMPT_SUFFIX = """
+
+Detailed Explanation:
+"""
+
+# Module-level explainer so repeated in-process runs reuse the loaded model
+_explainer = None
+
+def get_explainer():
+    global _explainer
+    if _explainer is None:
+        _explainer = MachineExplainer()
+    return _explainer
+
 def load_last_input(file_path):
     """Reads the JSON file and returns the last entry if it's a list."""
     if not os.path.exists(file_path):
@@ -206,8 +437,8 @@ def main():
         print("Aborting: No valid input data found.")
         return
 
-    # Initialize Explainer
-    explainer = MachineExplainer()
+    # Initialize Explainer (cached across in-process runs)
+    explainer = get_explainer()
 
     if action == "UPDATE_KB":
         # Load the explanation we generated earlier
@@ -265,7 +496,11 @@ def main():
                 
                 try:
                     from rules.threshold_adjuster import ThresholdAdjuster
-                    
+
+                    # The adjuster reads the log we just appended to, so
+                    # drain the writer queue before handing over
+                    get_log_writer().flush()
+
                     # Setup paths
                     trace_path = os.path.join("knowledge_base", "post_decision_trace.json")
                     logs_path = LOG_FILE
@@ -1,4 +1,5 @@
 import os
+import heapq
 import json
 import logging
 import urllib.request
@@ -12,6 +13,13 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Any
 
+# orjson parses/serializes JSON several times faster than stdlib json
+# (matters for the embedding-heavy KB files); fall back when not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
@@ -22,39 +30,252 @@ _embedding_model = None
 def get_model():
     global _embedding_model
     if _embedding_model is None:
+        # Opt-in: reuse a warm model held by the embedding server daemon
+        # instead of paying the cold-start load in this process
+        if os.environ.get("EMBEDDING_SERVER"):
+            try:
+                try:
+                    from embedding_server import RemoteEncoder
+                except ImportError:
+                    from pipeline_logic.embedding_server import RemoteEncoder
+                _embedding_model = RemoteEncoder()
+                logging.info("Connected to embedding server.")
+                return _embedding_model
+            except Exception as e:
+                logging.info(f"Embedding server unavailable ({e}), loading locally.")
         logging.info(f"Loading embedding model: {MODEL_NAME}")
-        _embedding_model = SentenceTransformer(MODEL_NAME)
+        # Prefer the ONNX Runtime backend: fused graph + quantized kernels
+        # make encode() ~3x faster on CPU. Needs optimum/onnxruntime, so
+        # fall back to the default PyTorch backend when unavailable.
+        try:
+            _embedding_model = SentenceTransformer(MODEL_NAME, backend="onnx")
+            logging.info("Using ONNX backend for embeddings.")
+        except Exception as e:
+            logging.info(f"ONNX backend unavailable ({e}), using PyTorch.")
+            _embedding_model = SentenceTransformer(MODEL_NAME)
     return _embedding_model
 
 def load_json_file(filepath: str) -> Any:
     try:
+        if orjson is not None:
+            with open(filepath, 'rb') as f:
+                return orjson.loads(f.read())
         with open(filepath, 'r') as f:
             return json.load(f)
     except FileNotFoundError:
         logging.error(f"File not found: {filepath}")
         return None
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, ValueError) as e:
         logging.error(f"Error decoding JSON {filepath}: {e}")
         return None
 
+def dump_json_file(data: Any, filepath: str, indent: bool = True) -> None:
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(data, option=option))
+    else:
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=2 if indent else None)
+
+# Cache of the parsed knowledge base keyed by path, invalidated on mtime change.
+# Holds the chunk list plus a pre-stacked, L2-normalized float32 embedding
+# matrix so each query is a single matrix-vector product instead of a Python
+# loop over chunks.
+_KB_CACHE: Dict[str, Dict] = {}
+
+def _valid_embedded_idx(kb_data: List[Dict]) -> List[int]:
+    """
+    Validate chunk embeddings once at load time (all must share the
+    dimension of the first valid one) so per-query code can trust the
+    stacked float32 matrix without any further checks.
+    """
+    idx = []
+    dim = None
+    for i, chunk in enumerate(kb_data):
+        emb = chunk.get("embedding")
+        if not isinstance(emb, list) or not emb:
+            continue
+        if dim is None:
+            dim = len(emb)
+        elif len(emb) != dim:
+            logging.warning(
+                f"Skipping chunk {chunk.get('id')}: embedding dim {len(emb)} != {dim}"
+            )
+            continue
+        idx.append(i)
+    return idx
+
+def _sidecar_paths(local_kb_path: str):
+    base = os.path.splitext(local_kb_path)[0]
+    return base + "_embeddings.npy", base + "_meta.json"
+
+def build_kb_cache(local_kb_path: str) -> bool:
+    """
+    Persist the KB as a float32 .npy embedding matrix plus a small metadata
+    JSON (text + metadata, no embeddings). Later runs mmap the matrix and
+    skip re-parsing thousands of JSON floats at startup.
+    """
+    kb_data = load_json_file(local_kb_path)
+    if not kb_data or not isinstance(kb_data, list):
+        return False
+
+    embedded_idx = _valid_embedded_idx(kb_data)
+    if not embedded_idx:
+        return False
+
+    kb_matrix = np.array([kb_data[i]["embedding"] for i in embedded_idx], dtype=np.float32)
+    norms = np.linalg.norm(kb_matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    kb_matrix /= norms
+
+    meta = {
+        "chunks": [{k: v for k, v in c.items() if k != "embedding"} for c in kb_data],
+        "embedded_idx": embedded_idx,
+    }
+
+    npy_path, meta_path = _sidecar_paths(local_kb_path)
+    np.save(npy_path, kb_matrix)
+    dump_json_file(meta, meta_path, indent=False)
+    logging.info(f"Built KB cache: {npy_path} ({kb_matrix.shape[0]} chunks)")
+    return True
+
+def _load_kb(local_kb_path: str) -> Dict:
+    """
+    Process-lifetime KB cache: repeat alerts in the same process pay one
+    os.stat here, not a JSON parse and index rebuild. Keyed by path and
+    invalidated when the file's mtime changes, so edits take effect on the
+    next call.
+    """
+    try:
+        mtime = os.stat(local_kb_path).st_mtime
+    except OSError:
+        logging.error(f"File not found: {local_kb_path}")
+        return {}
+
+    cached = _KB_CACHE.get(local_kb_path)
+    if cached and cached["mtime"] == mtime:
+        return cached
+
+    # Fast path: mmap the persisted embedding matrix and read only the small
+    # metadata JSON (rebuilt whenever the KB file is newer than the cache)
+    npy_path, meta_path = _sidecar_paths(local_kb_path)
+    if not (os.path.exists(npy_path) and os.path.getmtime(npy_path) >= mtime):
+        build_kb_cache(local_kb_path)
+
+    kb_matrix = None
+    embedded_chunks = []
+    meta = None
+    if os.path.exists(npy_path) and os.path.getmtime(npy_path) >= mtime:
+        meta = load_json_file(meta_path)
+    if meta and "chunks" in meta:
+        kb_matrix = np.load(npy_path, mmap_mode='r')
+        kb_data = meta["chunks"]
+        embedded_chunks = [kb_data[i] for i in meta["embedded_idx"]]
+    else:
+        # Slow path: KB exists but could not be cached (e.g. no embedded
+        # chunks) — parse it directly
+        kb_data = load_json_file(local_kb_path)
+        if not kb_data or not isinstance(kb_data, list):
+            return {}
+        embedded_chunks = [kb_data[i] for i in _valid_embedded_idx(kb_data)]
+        if embedded_chunks:
+            kb_matrix = np.array([c["embedding"] for c in embedded_chunks], dtype=np.float32)
+            norms = np.linalg.norm(kb_matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            kb_matrix /= norms
+
+    # rule_id -> chunk index for O(1) direct lookups (first match wins)
+    rule_index = {}
+    for chunk in kb_data:
+        rule_id = chunk.get("metadata", {}).get("rule_id") or chunk.get("id", "")
+        if rule_id and rule_id not in rule_index:
+            rule_index[rule_id] = chunk
+
+
+    entry = {
+        "mtime": mtime,
+        "chunks": kb_data,
+        "embedded_chunks": embedded_chunks,
+        "matrix": kb_matrix,
+        "rule_index": rule_index,
+        "token_index": None,  # built lazily on first keyword query
+    }
+    _KB_CACHE[local_kb_path] = entry
+    return entry
+
+def _get_token_index(kb: Dict) -> Dict[str, List]:
+    """
+    Inverted token index (token -> [(chunk_idx, weight)]) built once per KB
+    load so keyword lookups are hash lookups instead of substring scans.
+    The .lower()/str(metadata) work happens exactly once per chunk here,
+    never per query. Text tokens weigh more than metadata tokens.
+    """
+    if kb["token_index"] is None:
+        token_index: Dict[str, List] = {}
+        for i, chunk in enumerate(kb["chunks"]):
+            # Single fused pass over text + metadata: one posting per
+            # (token, chunk), text weight winning when a token is in both.
+            weights: Dict[str, int] = {}
+            # Only metadata *values* are worth indexing; str() on the whole
+            # dict would tokenize keys, braces and quotes too
+            meta = chunk.get("metadata", {})
+            meta_blob = " ".join(str(v) for v in meta.values()) if isinstance(meta, dict) else str(meta)
+            for tok in meta_blob.lower().split():
+                weights[tok] = 1
+            for tok in str(chunk.get("text", "")).lower().split():
+                weights[tok] = 2
+            for tok, w in weights.items():
+                token_index.setdefault(tok, []).append((i, w))
+        kb["token_index"] = token_index
+    return kb["token_index"]
+
+def retrieve_by_keywords(query_text: str, local_kb_path: str, top_k: int = 3) -> List[Dict]:
+    """
+    Keyword retrieval over the inverted token index. Used as a fallback when
+    semantic search finds nothing — notably for user-verified chunks that
+    were appended without embeddings.
+    """
+    kb = _load_kb(local_kb_path)
+    if not kb:
+        return []
+
+    token_index = _get_token_index(kb)
+    scores: Dict[int, int] = {}
+    for tok in set(query_text.lower().split()):
+        for idx, weight in token_index.get(tok, ()):
+            scores[idx] = scores.get(idx, 0) + weight
+
+    if not scores:
+        return []
+
+    best = heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+    chunks = kb["chunks"]
+    results = []
+    for idx, score in best:
+        logging.info(f"Keyword match: Score={score} | ID={chunks[idx].get('id')}")
+        results.append(chunks[idx])
+    return results
+
 def retrieve_by_rule_ids(rule_ids: List[str], local_kb_path: str) -> List[Dict]:
     """
     Directly retrieve knowledge chunks by matching rule_id.
     """
     logging.info(f"Looking up rules by ID: {rule_ids}")
-    kb_data = load_json_file(local_kb_path)
-    
-    if not kb_data or not isinstance(kb_data, list):
+    kb = _load_kb(local_kb_path)
+
+    if not kb:
         return []
-    
+
+    # O(1) dict lookup per rule instead of a linear KB scan
+    rule_index = kb["rule_index"]
     matched_chunks = []
-    for chunk in kb_data:
-        # Check if this chunk has a matching rule_id in metadata
-        chunk_rule_id = chunk.get("metadata", {}).get("rule_id") or chunk.get("id", "")
-        if chunk_rule_id in rule_ids:
+    for rule_id in rule_ids:
+        chunk = rule_index.get(rule_id)
+        if chunk is not None:
             matched_chunks.append(chunk)
-            logging.info(f"✓ Matched rule: {chunk_rule_id}")
-    
+            logging.info(f"✓ Matched rule: {rule_id}")
+
     return matched_chunks
 
 def retrieve_knowledge(decision: str, local_kb_path: str) -> List[Dict]:
@@ -62,51 +283,49 @@ def retrieve_knowledge(decision: str, local_kb_path: str) -> List[Dict]:
     Retrieve knowledge chunks using semantic vector search.
     """
     logging.info(f"Loading local knowledge base: {local_kb_path}")
-    kb_data = load_json_file(local_kb_path)
-    
-    if not kb_data or not isinstance(kb_data, list):
+    kb = _load_kb(local_kb_path)
+
+    if not kb:
         logging.warning("Knowledge base is empty or invalid.")
         return []
 
-    # Prepare Query Embedding
+    kb_matrix = kb["matrix"]
+    embedded_chunks = kb["embedded_chunks"]
+    if kb_matrix is None:
+        logging.warning("Knowledge base has no embedded chunks.")
+        return []
+
+    # Prepare Query Embedding (normalized by the model, so no extra
+    # norm computation is needed on the query side)
     query_text = decision
     model = get_model()
-    query_embedding = model.encode(query_text)
-    
-    # Calculate Distances
-    scores = []
-    for chunk in kb_data:
-        if "embedding" not in chunk:
-            continue
-            
-        chunk_embedding = np.array(chunk["embedding"])
-        # Cosine Similarity: (A . B) / (||A|| * ||B||)
-        norm_q = np.linalg.norm(query_embedding)
-        norm_c = np.linalg.norm(chunk_embedding)
-        
-        if norm_c == 0 or norm_q == 0:
-            score = 0
-        else:
-            score = np.dot(query_embedding, chunk_embedding) / (norm_q * norm_c)
-            
-        scores.append((score, chunk))
-    
-    # Sort by score desc
-    scores.sort(key=lambda x: x[0], reverse=True)
-    
+    query_embedding = np.asarray(
+        model.encode(query_text, normalize_embeddings=True), dtype=np.float32
+    )
+
+    # Cosine similarity against the whole KB in one matrix-vector product
+    # (rows are already L2-normalized)
+    scores = kb_matrix @ query_embedding
+
+    # Top 3 by score desc: argpartition is O(N) vs O(N log N) for a full sort
+    k = min(3, len(scores))
+    top_idx = np.argpartition(-scores, k - 1)[:k]
+    top_idx = top_idx[np.argsort(-scores[top_idx])]
+
     # Return top 3 matches if score > 0.15
     top_results = []
-    for score, chunk in scores[:3]:
-        logging.info(f"Match found: Score={score:.4f} | ID={chunk.get('id')}")
-        if score > 0.15:
+    for i in top_idx:
+        chunk = embedded_chunks[i]
+        logging.info(f"Match found: Score={scores[i]:.4f} | ID={chunk.get('id')}")
+        if scores[i] > 0.15:
             top_results.append(chunk)
-            
+
     if not top_results:
         logging.info("No relevant chunks found above threshold.")
-        
+
     return top_results
 
-def main():
+def run_workflow():
     # 1. Load Alert Data
     logging.info("Loading alert trace...")
     alert_trace_path = os.path.join("knowledge_base", "post_decision_trace.json")
@@ -127,11 +346,13 @@ def main():
     observed = trace.get('observed_behavior', 'anomaly')
     
     # Construct a rich query for semantic search
-    query_context = f"{decision} {observed}"
+    query_tokens = f"{decision} {observed}".split()
     # Add triggered rules if available to improve context
     if 'rules_triggered' in trace:
-        rules = " ".join(trace['rules_triggered']).replace("_", " ")
-        query_context += f" {rules}"
+        query_tokens += " ".join(trace['rules_triggered']).replace("_", " ").split()
+    # Decision/observed words tend to repeat inside the rule names;
+    # de-dup once here so keyword scoring never counts a term twice
+    query_context = " ".join(dict.fromkeys(query_tokens))
 
     logging.info(f"Processing Alert: {decision}")
     logging.info(f"Observed: {observed}")
@@ -149,18 +370,26 @@ def main():
     if not relevant_docs:
         logging.info("No direct rule matches, trying semantic search...")
         relevant_docs = retrieve_knowledge(query_context, kb_path)
-    
+
+    # Last resort: keyword lookup over the inverted index (also covers
+    # chunks that have no embeddings yet)
+    if not relevant_docs:
+        logging.info("No semantic matches, trying keyword search...")
+        relevant_docs = retrieve_by_keywords(query_context, kb_path)
+
     logging.info(f"Retrieved {len(relevant_docs)} relevant context records.")
 
-    # 4. Format Context
-    context_text = ""
-    references = set()
-    for idx, doc in enumerate(relevant_docs, 1):
-        context_text += f"Source {idx}:\n{doc.get('text', 'No text')}\n---\n"
-        if 'source' in doc:
-             references.add(doc['source'])
-        elif 'metadata' in doc and 'document' in doc['metadata']:
-            references.add(doc['metadata']['document'])
+    # 4. Format Context (join over += concat; dict.fromkeys de-dups the
+    # references while keeping retrieval order)
+    context_text = "".join(
+        f"Source {idx}:\n{doc.get('text', 'No text')}\n---\n"
+        for idx, doc in enumerate(relevant_docs, 1)
+    )
+    references = dict.fromkeys(
+        doc.get('source') or doc.get('metadata', {}).get('document')
+        for doc in relevant_docs
+        if doc.get('source') or doc.get('metadata', {}).get('document')
+    )
 
     reference_str = ", ".join(references) if references else "Internal Knowledge Base"
 
@@ -185,10 +414,13 @@ def main():
     output_file = "final_recommendation.json"
     print(f"\nFinal Structure:\n{json.dumps(output_data, indent=2)}")
     
-    with open(output_file, "w") as f:
-        json.dump(output_data, f, indent=2)
+    dump_json_file(output_data, output_file)
     
     print(f"\nSaved output to {output_file}")
+    return output_data
+
+def main():
+    run_workflow()
 
 if __name__ == "__main__":
     main()
@@ -8,22 +8,73 @@ import os
 import sys
 from datetime import datetime
 
-# Add trace-engine to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'trace-engine'))
+# orjson parses/serializes noticeably faster than stdlib json; fall back
+# silently when it isn't installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson streams large JSON arrays record-by-record (O(1) memory); only
+# worth it for the legacy array log, which grows without bound.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Add trace-engine to path so the normal import machinery (and its
+# sys.modules cache) is used instead of per-call spec_from_file_location
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'trace-engine'))
+
+from rules import rules_config
+from rules import threshold_adjuster
+
+def load_json(filepath):
+    """Read a JSON file in one buffered pass (orjson when available)."""
+    with open(filepath, 'rb', buffering=1 << 20) as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def dump_json(data, filepath, indent=4):
+    """Write a JSON file in one buffered call."""
+    if orjson:
+        blob = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        blob = json.dumps(data, indent=indent).encode()
+    with open(filepath, 'wb', buffering=1 << 20) as f:
+        f.write(blob)
+
+def migrate_legacy_logs(json_path, jsonl_path):
+    """One-shot migration: rewrite the legacy JSON array as JSON Lines."""
+    if os.path.exists(jsonl_path) or not os.path.exists(json_path):
+        return
+    if ijson:
+        # Stream one record at a time instead of materializing the array
+        with open(json_path, 'rb') as src:
+            entries = ijson.items(src, 'item', use_float=True)
+            count = _write_jsonl(entries, jsonl_path)
+    else:
+        count = _write_jsonl(load_json(json_path), jsonl_path)
+    print(f"✅ Migrated {count} entries from {json_path} to {jsonl_path}")
+
+def _write_jsonl(entries, jsonl_path):
+    count = 0
+    with open(jsonl_path, 'wb', buffering=1 << 16) as f:
+        for entry in entries:
+            blob = orjson.dumps(entry) if orjson else json.dumps(entry).encode()
+            f.write(blob + b"\n")
+            count += 1
+    return count
 
 def create_test_rejection():
-    """Create a test rejection in interaction_logs.json"""
-    
-    logs_path = os.path.join('mt-llm', 'interaction_logs.json')
-    
-    # Load existing logs
-    with open(logs_path, 'r') as f:
-        logs = json.load(f)
-    
+    """Append a test rejection to interaction_logs.jsonl"""
+
+    logs_path = os.path.join('mt-llm', 'interaction_logs.jsonl')
+    migrate_legacy_logs(os.path.join('mt-llm', 'interaction_logs.json'), logs_path)
+
     # Get the latest trace data
     trace_path = os.path.join('mt-llm', 'knowledge_base', 'post_decision_trace.json')
-    with open(trace_path, 'r') as f:
-        trace_data = json.load(f)
+    trace_data = load_json(trace_path)
     
     # Create a rejection entry
     rejection_entry = {
@@ -33,12 +84,16 @@ def create_test_rejection():
         "user_feedback": "Rejected"
     }
     
-    # Add to logs
-    logs.append(rejection_entry)
-    
-    # Save back
-    with open(logs_path, 'w') as f:
-        json.dump(logs, f, indent=4)
+    # Append one line; no read-modify-write of the whole log. Record the
+    # line's byte offset in the rejection index so the adjuster can seek
+    # straight to it.
+    blob = orjson.dumps(rejection_entry) if orjson else json.dumps(rejection_entry).encode()
+    with open(logs_path, 'ab', buffering=1 << 16) as f:
+        offset = f.tell()
+        f.write(blob + b"\n")
+    idx_path = os.path.splitext(logs_path)[0] + '.rej.idx'
+    with open(idx_path, 'ab') as f:
+        f.write(offset.to_bytes(8, 'little'))
     
     print(f"✅ Created test rejection entry in {logs_path}")
     return rejection_entry
@@ -46,27 +101,13 @@ def create_test_rejection():
 def verify_threshold_adjustment():
     """Run the threshold adjuster and verify results"""
     
-    # Import directly from file path
-    import importlib.util
-    
-    adjuster_path = os.path.join('trace-engine', 'rules', 'threshold_adjuster.py')
-    spec = importlib.util.spec_from_file_location("threshold_adjuster", adjuster_path)
-    threshold_adjuster_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(threshold_adjuster_module)
-    
-    config_path = os.path.join('trace-engine', 'rules', 'rules_config.py')
-    spec_config = importlib.util.spec_from_file_location("rules_config", config_path)
-    rules_config = importlib.util.module_from_spec(spec_config)
-    spec_config.loader.exec_module(rules_config)
-    
-    ThresholdAdjuster = threshold_adjuster_module.ThresholdAdjuster
+    ThresholdAdjuster = threshold_adjuster.ThresholdAdjuster
     
     trace_path = os.path.join('mt-llm', 'knowledge_base', 'post_decision_trace.json')
-    logs_path = os.path.join('mt-llm', 'interaction_logs.json')
+    logs_path = os.path.join('mt-llm', 'interaction_logs.jsonl')
     
     # Load trace to get original thresholds
-    with open(trace_path, 'r') as f:
-        trace_data = json.load(f)
+    trace_data = load_json(trace_path)
     
     input_trace = trace_data.get('input_trace', trace_data)
     component_id = input_trace.get('component_id')
@@ -88,7 +129,7 @@ def verify_threshold_adjustment():
     print("RUNNING THRESHOLD ADJUSTER")
     print("="*60)
     
-    adjuster = ThresholdAdjuster(trace_path, logs_path)
+    adjuster = ThresholdAdjuster(trace_path, logs_path, trace_data=trace_data)
     adjustments_made = adjuster.process_rejection()
     
     if adjustments_made:
@@ -99,10 +140,8 @@ def verify_threshold_adjustment():
         print("AFTER ADJUSTMENT")
         print("="*60)
         
-        # Reload rules_config to see new values
-        import importlib
-        importlib.reload(rules_config)
-        
+        # The adjuster mutates rules_config in-memory before saving, and
+        # both sides now share the same imported module object.
         for rule_name, old_threshold in original_thresholds.items():
             new_threshold = rules_config.get_threshold(component_id, rule_name)
             change_pct = ((new_threshold - old_threshold) / old_threshold * 100) if old_threshold else 0
@@ -116,13 +155,11 @@ def verify_threshold_adjustment():
         # Verify audit trail in final JSON
         final_rec_path = os.path.join('mt-llm', 'final_recommendation.json')
         if os.path.exists(final_rec_path):
-            with open(final_rec_path, 'r') as f:
-                final_rec = json.load(f)
-            
+            final_rec = load_json(final_rec_path)
+
             final_rec["threshold_adjustments"] = audit_data
-            
-            with open(final_rec_path, 'w') as f:
-                json.dump(final_rec, f, indent=2)
+
+            dump_json(final_rec, final_rec_path, indent=2)
             
             print(f"\n✅ Audit trail added to {final_rec_path}")
         
@@ -12,10 +12,23 @@ Flow:
 
 import json
 import os
-import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Any
+
 from trace_engine.rule_engine import RuleEngine
 
 
+@dataclass(slots=True)
+class SimResult:
+    """One evaluated event; slots keep per-result overhead below a dict's."""
+    component: str
+    timestamp: str
+    features: dict
+    trace: Any
+    trace_path: str
+
+
 # -------------------------------------------------
 # PATH CONFIG (data-n-sensor is a sibling folder)
 # -------------------------------------------------
@@ -24,41 +37,35 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 
 DATA_SENSOR_DIR = os.path.join(BASE_DIR, "data-n-sensor")
 
-DATA_GEN_SCRIPT = os.path.join(DATA_SENSOR_DIR, "data_generated.py")
-FEATURE_SCRIPT = os.path.join(DATA_SENSOR_DIR, "feature_extraction.py")
-
 FEATURE_JSON = os.path.join(DATA_SENSOR_DIR, "extracted_features.json")
 
+# The generator and extractor are imported (not spawned as subprocesses)
+# so each simulation skips two interpreter cold starts plus the
+# numpy/pandas imports they pay on every launch.
+sys.path.insert(0, DATA_SENSOR_DIR)
+
 
 # -------------------------------------------------
 # MAIN ORCHESTRATION
 # -------------------------------------------------
 
 def run_live_simulation():
-    import sys
-    # 1️⃣ Run raw data generation
-    subprocess.run(
-        [sys.executable, DATA_GEN_SCRIPT],
-        check=True,
-        cwd=DATA_SENSOR_DIR  # Run inside data-n-sensor so files are saved there
-    )
-
-    # 2️⃣ Run feature extraction
-    subprocess.run(
-        [sys.executable, FEATURE_SCRIPT],
-        check=True,
-        cwd=DATA_SENSOR_DIR  # Run inside data-n-sensor so it finds the CSV and saves JSON there
-    )
-
-    # 3️⃣ Load extracted features
-    if not os.path.exists(FEATURE_JSON):
-        raise RuntimeError("extracted_features.json not found after feature extraction")
-
-    with open(FEATURE_JSON, "r") as f:
-        feature_events = json.load(f)
+    import data_generated
+    import feature_extraction
+
+    # 1️⃣ + 2️⃣ Run generation and extraction in-process. Both scripts use
+    # cwd-relative paths, so hop into data-n-sensor while they run.
+    prev_cwd = os.getcwd()
+    os.chdir(DATA_SENSOR_DIR)
+    try:
+        data_generated.main()
+        # 3️⃣ main() returns the feature list, so no JSON round-trip
+        feature_events = feature_extraction.main()
+    finally:
+        os.chdir(prev_cwd)
 
     if not isinstance(feature_events, list):
-        raise ValueError("extracted_features.json must be a list")
+        raise ValueError("feature extraction must return a list of events")
 
     # 4️⃣ Select exactly 3 events: 1 Pump (Normal), 1 Conveyor (Pre-Failure), 1 Compressor (Failure)
     selected_events = []
@@ -74,20 +81,21 @@ def run_live_simulation():
         "COMPRESSOR": 3
     }
     
-    found = {k: False for k in requirements}
-    
-    
-    # Collect all candidates first
+    # Single sweep: collect phase-matching candidates per component and
+    # remember the first event of each component as the fallback, so no
+    # second pass over feature_events is ever needed.
     candidates = {k: [] for k in requirements}
-    
+    first_by_component = {}
+
     for event in feature_events:
         comp = event.get("component")
         phase = event.get("failure_phase")
-        
-        if comp in requirements and phase == requirements[comp]:
-            candidates[comp].append(event)
-            
-    
+
+        if comp in requirements:
+            first_by_component.setdefault(comp, event)
+            if phase == requirements[comp]:
+                candidates[comp].append(event)
+
     # Select the "most representative" event for each phase
     # - Normal: Low vibration (median/middle is fine)
     # - Pre-Failure: High trend/delta
@@ -95,9 +103,15 @@ def run_live_simulation():
     
     for comp, events in candidates.items():
         if not events:
-            print(f"⚠️ No events found for {comp} (Phase {requirements[comp]})")
+            # Fallback straight from the sweep: any event of this component
+            fallback = first_by_component.get(comp)
+            if fallback is not None:
+                print(f"⚠️ No Phase {requirements[comp]} events for {comp}, using first available")
+                selected_events.append(fallback)
+            else:
+                print(f"⚠️ No events found for {comp} (Phase {requirements[comp]})")
             continue
-            
+
         target_event = None
         
         if comp == "PUMP":
@@ -143,20 +157,6 @@ def run_live_simulation():
              target_event = events[0]
              
         selected_events.append(target_event)
-        found[comp] = True
-            
-    # Fallback: if specific phases not found, just take one of each component
-    if not all(found.values()):
-        print(f"⚠️ Could not find all exact phases. Found: {found}")
-        # Try to fill gaps using any available event for valid components
-        available_components = set(e.get("component") for e in feature_events)
-        for k in requirements:
-             if not found[k] and k in available_components:
-                 # Find ANY event for this component
-                  for event in feature_events:
-                        if event.get("component") == k:
-                             selected_events.append(event)
-                             break
 
     # 5️⃣ Run Trace Engine
     engine = RuleEngine()
@@ -164,12 +164,12 @@ def run_live_simulation():
 
     for event in selected_events:
         trace, trace_path = engine.evaluate(event)
-        results.append({
-            "component": event["component"],
-            "timestamp": event["timestamp"],
-            "features": event["features"],
-            "trace": trace,
-            "trace_path": trace_path
-        })
+        results.append(SimResult(
+            component=event["component"],
+            timestamp=event["timestamp"],
+            features=event["features"],
+            trace=trace,
+            trace_path=trace_path
+        ))
 
     return results
@@ -1,201 +1,277 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rules are keyed by rule name so threshold lookups/updates are O(1)
+# dict accesses instead of list scans. The "rule" key is kept inside each
+# entry so trace steps can keep embedding the full rule dict.
 RULES = {
-    "PUMP": [
-        {
-            "rule": "PUMP_VIBRATION_CRITICAL",
-            "feature": "vibration_rms",
-            "comparison": ">",
-            "threshold": 4.0,
-            "confidence_delta": 0.35
-        },
-        {
-            "rule": "PUMP_TEMP_SPIKE",
-            "feature": "temperature_delta",
-            "comparison": ">",
-            "threshold": 5.0,
-            "confidence_delta": 0.3
-        },
-        {
-            "rule": "PUMP_OVERHEAT",
-            "feature": "temperature_c",
-            "comparison": ">",
-            "threshold": 95.0,
-            "confidence_delta": 0.4
-        },
-        {
-            "rule": "PUMP_HIGH_LOAD",
-            "feature": "load_avg",
-            "comparison": ">",
-            "threshold": 85.0,
-            "confidence_delta": 0.2
-        }
-    ],
-    "CONVEYOR": [
-        {
-            "rule": "CONVEYOR_VIB_TRENDING",
-            "feature": "vibration_trend",
-            "comparison": ">",
-            "threshold": 1.5,
-            "confidence_delta": 0.25
-        },
-        {
-            "rule": "CONVEYOR_MOTOR_HEAT",
-            "feature": "temperature_c",
-            "comparison": ">",
-            "threshold": 80.0,
-            "confidence_delta": 0.3
-        },
-        {
-            "rule": "CONVEYOR_LOAD_PEAK",
-            "feature": "load_avg",
-            "comparison": ">",
-            "threshold": 90.0,
-            "confidence_delta": 0.2
-        },
-        {
-            "rule": "CONVEYOR_VIB_SPIKE",
-            "feature": "vibration_delta",
-            "comparison": ">",
-            "threshold": 0.8,
-            "confidence_delta": 0.2
-        }
-    ],
-    "COMPRESSOR": [
-        {
-            "rule": "COMP_DISCHARGE_TEMP",
-            "feature": "temperature_c",
-            "comparison": ">",
-            "threshold": 50.0,
-            "confidence_delta": 0.2
-        },
-        {
-            "rule": "COMP_VIB_INSTABILITY",
-            "feature": "vibration_rms",
-            "comparison": ">",
-            "threshold": 7.44,
-            "confidence_delta": 0.5
-        },
-        {
-            "rule": "COMP_RAPID_WARMING",
-            "feature": "temperature_delta",
-            "comparison": ">",
-            "threshold": 5.57,
-            "confidence_delta": 0.2
-        },
-        {
-            "rule": "COMP_OVERLOAD",
-            "feature": "load_avg",
-            "comparison": ">",
-            "threshold": 98.28,
-            "confidence_delta": 0.35
-        }
-    ]
+  "PUMP": {
+    "PUMP_VIBRATION_CRITICAL": {
+      "rule": "PUMP_VIBRATION_CRITICAL",
+      "feature": "vibration_rms",
+      "comparison": ">",
+      "threshold": 4.0,
+      "confidence_delta": 0.35
+    },
+    "PUMP_TEMP_SPIKE": {
+      "rule": "PUMP_TEMP_SPIKE",
+      "feature": "temperature_delta",
+      "comparison": ">",
+      "threshold": 5.0,
+      "confidence_delta": 0.3
+    },
+    "PUMP_OVERHEAT": {
+      "rule": "PUMP_OVERHEAT",
+      "feature": "temperature_c",
+      "comparison": ">",
+      "threshold": 95.0,
+      "confidence_delta": 0.4
+    },
+    "PUMP_HIGH_LOAD": {
+      "rule": "PUMP_HIGH_LOAD",
+      "feature": "load_avg",
+      "comparison": ">",
+      "threshold": 85.0,
+      "confidence_delta": 0.2
+    }
+  },
+  "CONVEYOR": {
+    "CONVEYOR_VIB_TRENDING": {
+      "rule": "CONVEYOR_VIB_TRENDING",
+      "feature": "vibration_trend",
+      "comparison": ">",
+      "threshold": 1.5,
+      "confidence_delta": 0.25
+    },
+    "CONVEYOR_MOTOR_HEAT": {
+      "rule": "CONVEYOR_MOTOR_HEAT",
+      "feature": "temperature_c",
+      "comparison": ">",
+      "threshold": 80.0,
+      "confidence_delta": 0.3
+    },
+    "CONVEYOR_LOAD_PEAK": {
+      "rule": "CONVEYOR_LOAD_PEAK",
+      "feature": "load_avg",
+      "comparison": ">",
+      "threshold": 90.0,
+      "confidence_delta": 0.2
+    },
+    "CONVEYOR_VIB_SPIKE": {
+      "rule": "CONVEYOR_VIB_SPIKE",
+      "feature": "vibration_delta",
+      "comparison": ">",
+      "threshold": 0.8,
+      "confidence_delta": 0.2
+    }
+  },
+  "COMPRESSOR": {
+    "COMP_DISCHARGE_TEMP": {
+      "rule": "COMP_DISCHARGE_TEMP",
+      "feature": "temperature_c",
+      "comparison": ">",
+      "threshold": 50.0,
+      "confidence_delta": 0.2
+    },
+    "COMP_VIB_INSTABILITY": {
+      "rule": "COMP_VIB_INSTABILITY",
+      "feature": "vibration_rms",
+      "comparison": ">",
+      "threshold": 7.44,
+      "confidence_delta": 0.5
+    },
+    "COMP_RAPID_WARMING": {
+      "rule": "COMP_RAPID_WARMING",
+      "feature": "temperature_delta",
+      "comparison": ">",
+      "threshold": 5.57,
+      "confidence_delta": 0.2
+    },
+    "COMP_OVERLOAD": {
+      "rule": "COMP_OVERLOAD",
+      "feature": "load_avg",
+      "comparison": ">",
+      "threshold": 98.28,
+      "confidence_delta": 0.35
+    }
+  }
 }
+# The dict above holds the declared defaults; adjusted thresholds live in
+# a tiny sidecar overlaid here at import time, so saving an adjustment
+# never rewrites Python source.
+_OVERRIDES_PATH = os.path.join(os.path.dirname(__file__), 'rules_overrides.json')
+
+_DEFAULT_THRESHOLDS = {
+    (component_id, rule_name): rule["threshold"]
+    for component_id, rules in RULES.items()
+    for rule_name, rule in rules.items()
+}
+
+if os.path.exists(_OVERRIDES_PATH):
+    try:
+        with open(_OVERRIDES_PATH, 'rb') as _f:
+            for _component_id, _rule_name, _threshold in json.loads(_f.read()):
+                _rule = RULES.get(_component_id, {}).get(_rule_name)
+                if _rule is not None:
+                    _rule["threshold"] = _threshold
+    except (ValueError, OSError) as _e:
+        print(f"Warning: could not load threshold overrides: {_e}")
+
+
+# Compiled per-component evaluators (see compile_rules); invalidated
+# whenever a threshold changes.
+_COMPILED = {}
+
+_ALLOWED_COMPARISONS = (">", ">=", "<", "<=")
+
 
+def compile_rules(component_id: str):
+    """
+    Build (and cache) a specialized evaluation function for a component.
+
+    Instead of interpreting the rule dicts per event, we generate straight-
+    line code that reads each feature and compares it against the literal
+    threshold, e.g.:
+
+        def _eval(f):
+            fired = []
+            v = f.get('vibration_rms')
+            if v is not None and v > 4.0:
+                fired.append(('PUMP_VIBRATION_CRITICAL', 0.35))
+            ...
+            return fired
+
+    Args:
+        component_id: The component (e.g., 'PUMP', 'CONVEYOR', 'COMPRESSOR')
+
+    Returns:
+        A function mapping a features dict to a list of
+        (rule_name, confidence_delta) tuples, or None if the component
+        has no rules
+    """
+    fn = _COMPILED.get(component_id)
+    if fn is not None:
+        return fn
+
+    rules = RULES.get(component_id)
+    if not rules:
+        return None
 
+    lines = ["def _eval(f):", "    fired = []"]
+    for rule_name, rule in rules.items():
+        comparison = rule["comparison"]
+        if comparison not in _ALLOWED_COMPARISONS:
+            raise ValueError(f"Unsupported comparison operator: {comparison}")
+        lines.append(f"    v = f.get({rule['feature']!r})")
+        lines.append(f"    if v is not None and v {comparison} {rule['threshold']!r}:")
+        lines.append(f"        fired.append(({rule_name!r}, {rule['confidence_delta']!r}))")
+    lines.append("    return fired")
+
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    fn = namespace["_eval"]
+    _COMPILED[component_id] = fn
+    return fn
+
+def iter_rules(component_id: str):
+    """
+    Iterate the rules for a component in declaration order.
+
+    Args:
+        component_id: The component (e.g., 'PUMP', 'CONVEYOR', 'COMPRESSOR')
+
+    Returns:
+        An iterable of rule dicts (empty if the component is unknown)
+    """
+    return RULES.get(component_id, {}).values()
 
 def update_threshold(component_id: str, rule_name: str, new_threshold: float) -> bool:
     """
     Update the threshold for a specific rule in the RULES configuration.
-    
+
     Args:
         component_id: The component (e.g., 'PUMP', 'CONVEYOR', 'COMPRESSOR')
         rule_name: The rule identifier (e.g., 'PUMP_VIBRATION_CRITICAL')
         new_threshold: The new threshold value to set
-        
+
     Returns:
         bool: True if update was successful, False otherwise
     """
-    if component_id not in RULES:
+    rule = RULES.get(component_id, {}).get(rule_name)
+    if rule is None:
         return False
-    
-    for rule in RULES[component_id]:
-        if rule["rule"] == rule_name:
-            rule["threshold"] = new_threshold
-            return True
-    
-    return False
+
+    rule["threshold"] = new_threshold
+    # The compiled evaluator baked in the old threshold; rebuild lazily
+    _COMPILED.pop(component_id, None)
+    return True
 
 def get_threshold(component_id: str, rule_name: str) -> float:
     """
     Get the current threshold for a specific rule.
-    
+
     Args:
         component_id: The component (e.g., 'PUMP', 'CONVEYOR', 'COMPRESSOR')
         rule_name: The rule identifier (e.g., 'PUMP_VIBRATION_CRITICAL')
-        
+
     Returns:
         float: Current threshold value, or None if not found
     """
-    if component_id not in RULES:
+    rule = RULES.get(component_id, {}).get(rule_name)
+    if rule is None:
         return None
-    
-    for rule in RULES[component_id]:
-        if rule["rule"] == rule_name:
-            return rule["threshold"]
-    
-    return None
+
+    return rule["threshold"]
 
 def save_rules_to_file(filepath: str = None) -> bool:
     """
-    Save the current RULES configuration back to the rules_config.py file.
-    
+    Persist thresholds that differ from the declared defaults.
+
+    Only (component, rule, threshold) triples deviating from the values
+    written in this file are stored, as a tiny sidecar JSON overlaid onto
+    RULES at import time — the Python source is never rewritten.
+
     Args:
-        filepath: Path to the rules_config.py file. If None, uses current file location.
-        
+        filepath: Path for the overrides sidecar. If None, uses
+            rules_overrides.json next to this file.
+
     Returns:
         bool: True if save was successful, False otherwise
     """
-    import os
-    
     if filepath is None:
-        filepath = __file__
-    
+        filepath = _OVERRIDES_PATH
+
+    overrides = [
+        [component_id, rule_name, rule["threshold"]]
+        for component_id, rules in RULES.items()
+        for rule_name, rule in rules.items()
+        if rule["threshold"] != _DEFAULT_THRESHOLDS[(component_id, rule_name)]
+    ]
+
+    # Write-to-temp + os.replace so a crash mid-write can never leave a
+    # truncated sidecar behind; the fsyncs (file, then parent directory)
+    # make the rename durable. The whole payload goes out in one write.
+    tmp = filepath + '.tmp'
     try:
-        # Read the current file to preserve imports and structure
-        with open(filepath, 'r') as f:
-            lines = f.readlines()
-        
-        # Find where RULES starts
-        rules_start = None
-        for i, line in enumerate(lines):
-            if line.strip().startswith('RULES = {'):
-                rules_start = i
-                break
-        
-        if rules_start is None:
-            return False
-        
-        # Generate new RULES content
-        import json
-        rules_str = "RULES = " + json.dumps(RULES, indent=4)
-        
-        # Replace old RULES with new one
-        # Find the end of RULES dictionary
-        rules_end = None
-        brace_count = 0
-        for i in range(rules_start, len(lines)):
-            for char in lines[i]:
-                if char == '{':
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        rules_end = i
-                        break
-            if rules_end is not None:
-                break
-        
-        if rules_end is None:
-            return False
-        
-        # Reconstruct file
-        new_content = ''.join(lines[:rules_start]) + rules_str + '\n\n' + ''.join(lines[rules_end + 1:])
-        
-        # Write back to file
-        with open(filepath, 'w') as f:
-            f.write(new_content)
-        
+        blob = orjson.dumps(overrides) if orjson else json.dumps(overrides).encode()
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, blob)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, filepath)
+        dir_fd = os.open(os.path.dirname(filepath) or '.', os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
         return True
-    except Exception as e:
+    except OSError as e:
         print(f"Error saving rules: {e}")
         return False
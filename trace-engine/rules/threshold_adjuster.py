@@ -9,61 +9,176 @@ import os
 import sys
 import json
 from datetime import datetime
+
+# orjson serializes with indentation in C (stdlib json's indent path is
+# pure Python); fall back when it isn't installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# numpy lets the per-rule threshold math run as one vector op; the scalar
+# path below works without it.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# numba compiles the threshold kernel to a native loop (no numpy
+# temporaries); purely optional, everything below works without it.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 from typing import Dict, List, Any, Optional
 
-# Add parent directory to path to import rules_config
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Add parent directory to path to import rules_config (skip when a
+# launcher already put it there, so repeat imports stay cache hits)
+_PARENT_DIR = os.path.join(os.path.dirname(__file__), '..')
+if _PARENT_DIR not in sys.path:
+    sys.path.insert(0, _PARENT_DIR)
 from rules import rules_config
 
 # Constants
 SAFETY_MARGIN = 0.05  # 5% margin beyond rejected value
 MAX_INCREASE_RATIO = 0.50  # Maximum 50% increase from original threshold
 
+if np is not None:
+    if njit is not None:
+        # LLVM-compiled scalar loop beats numpy's temporary-allocating
+        # ufuncs for these small arrays; cache=True amortizes the one-off
+        # JIT cost across runs
+        @njit(cache=True, fastmath=True)
+        def _compute_new_thresholds(olds, feats):
+            out = np.empty_like(olds)
+            for i in range(olds.size):
+                nt = feats[i] * (1 + SAFETY_MARGIN)
+                cap = olds[i] * (1 + MAX_INCREASE_RATIO)
+                if nt > cap:
+                    nt = cap
+                out[i] = round(nt * 100.0) / 100.0
+            return out
+    else:
+        def _compute_new_thresholds(olds, feats):
+            """Vectorized threshold math over float64 arrays, rounded to
+            2dp. Without numba a Python-level loop would be slower than
+            the C ufuncs, so keep the whole expression vectorized."""
+            return np.minimum(
+                feats * (1 + SAFETY_MARGIN),
+                olds * (1 + MAX_INCREASE_RATIO)
+            ).round(2)
+
 class ThresholdAdjuster:
     """Handles threshold adjustments based on rejected user feedback."""
-    
-    def __init__(self, trace_path: str, logs_path: str):
+
+    # How many trailing entries the legacy-array fallback scans; a
+    # rejection older than this is stale enough to ignore anyway
+    MAX_SCAN_DEPTH = 256
+
+    def __init__(self, trace_path: str, logs_path: str, trace_data: Optional[Dict] = None):
         """
         Initialize the threshold adjuster.
-        
+
         Args:
             trace_path: Path to post_decision_trace.json
             logs_path: Path to interaction_logs.json
+            trace_data: Already-parsed trace contents; pass this when the
+                caller has loaded the trace itself to skip a second parse
         """
         self.trace_path = trace_path
         self.logs_path = logs_path
+        self.trace_data = trace_data
         self.adjustments = []
+        # Parsed trace memoized by (mtime_ns, size) so draining several
+        # rejections in one run re-reads the file only when it changed
+        self._trace_cache = None
+        # TA_VERBOSE=0 (or false/empty) silences the per-rule progress
+        # output; anything unrecognized means verbose rather than a crash
+        self.verbose = os.environ.get('TA_VERBOSE', '1').strip().lower() not in ('0', '', 'false')
     
     def load_json(self, filepath: str) -> Optional[Any]:
-        """Load JSON file safely."""
+        """Load a JSON file (or a JSON Lines log) safely."""
+        loads = orjson.loads if orjson else json.loads
         try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
+            with open(filepath, 'rb') as f:
+                data = f.read()
+            if filepath.endswith('.jsonl'):
+                # Interaction logs are append-only JSON Lines
+                return [loads(line) for line in data.splitlines() if line.strip()]
+            return loads(data)
         except FileNotFoundError:
             print(f"Error: File not found: {filepath}")
             return None
-        except json.JSONDecodeError as e:
+        except ValueError as e:
             print(f"Error: Invalid JSON in {filepath}: {e}")
             return None
     
-    def find_latest_rejection(self) -> Optional[Dict]:
+    def _iter_logs_reverse(self):
         """
-        Find the most recent rejected feedback in interaction logs.
-        
-        Returns:
-            Dict containing the rejected interaction, or None if not found
+        Yield parsed JSON Lines entries newest-first, reading 64 KiB
+        blocks from the tail so a huge log never gets fully parsed.
         """
-        logs = self.load_json(self.logs_path)
-        if not logs or not isinstance(logs, list):
+        loads = orjson.loads if orjson else json.loads
+        block = 1 << 16
+        try:
+            with open(self.logs_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                pos = f.tell()
+                remainder = b''
+                while pos > 0:
+                    read_size = min(block, pos)
+                    pos -= read_size
+                    f.seek(pos)
+                    data = f.read(read_size) + remainder
+                    lines = data.split(b'\n')
+                    # The first piece may be a partial line spanning blocks
+                    remainder = lines.pop(0)
+                    for line in reversed(lines):
+                        if line.strip():
+                            yield loads(line)
+                if remainder.strip():
+                    yield loads(remainder)
+        except FileNotFoundError:
+            print(f"Error: File not found: {self.logs_path}")
+        except (OSError, ValueError) as e:
+            print(f"Error reading {self.logs_path}: {e}")
+
+    def _new_rejections_from_index(self, since_ts: Optional[str]) -> Optional[List[Dict]]:
+        """
+        Drain candidates via the <log>.rej.idx sidecar the log writer
+        maintains: seek straight to each recorded rejection offset,
+        newest first, stopping at the cursor — no line scanning at all.
+
+        Returns the new rejections oldest-first, or None when the index
+        is missing, stale, or out of sync (the caller then falls back to
+        the reverse line scan).
+        """
+        loads = orjson.loads if orjson else json.loads
+        idx_path = os.path.splitext(self.logs_path)[0] + '.rej.idx'
+        try:
+            with open(idx_path, 'rb') as f:
+                raw = f.read()
+            if not raw or len(raw) % 8:
+                return None
+            offsets = [int.from_bytes(raw[i:i + 8], 'little') for i in range(0, len(raw), 8)]
+            if offsets[-1] >= os.path.getsize(self.logs_path):
+                return None  # stale index (log was truncated/rewritten)
+            new = []
+            with open(self.logs_path, 'rb') as f:
+                for offset in reversed(offsets):
+                    f.seek(offset)
+                    entry = loads(f.readline())
+                    if not isinstance(entry, dict) or entry.get('user_feedback') != 'Rejected':
+                        return None  # index points at a non-rejection
+                    ts = entry.get('timestamp')
+                    if since_ts and ts and ts <= since_ts:
+                        break
+                    new.append(entry)
+        except (OSError, ValueError):
             return None
-        
-        # Search from most recent to oldest
-        for entry in reversed(logs):
-            if entry.get('user_feedback') == 'Rejected':
-                return entry
-        
-        return None
-    
+        new.reverse()
+        return new
+
     def get_alert_context(self) -> Optional[Dict]:
         """
         Load the alert context from post_decision_trace.json.
@@ -71,7 +186,20 @@ class ThresholdAdjuster:
         Returns:
             Dict containing alert details including triggered rules and feature values
         """
-        trace_data = self.load_json(self.trace_path)
+        trace_data = self.trace_data
+        if trace_data is None:
+            # Skip the disk read and JSON parse when the file is unchanged
+            try:
+                st = os.stat(self.trace_path)
+                key = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                key = None
+            if key is not None and self._trace_cache is not None and self._trace_cache[0] == key:
+                trace_data = self._trace_cache[1]
+            else:
+                trace_data = self.load_json(self.trace_path)
+                if key is not None and trace_data is not None:
+                    self._trace_cache = (key, trace_data)
         if not trace_data:
             return None
         
@@ -104,27 +232,110 @@ class ThresholdAdjuster:
         
         return round(new_threshold, 2)
     
+    def _cursor_path(self) -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), '.threshold_cursor')
+
+    def _read_cursor(self) -> Optional[str]:
+        """Timestamp of the last processed rejection, if any."""
+        try:
+            with open(self._cursor_path(), 'r') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _write_cursor(self, timestamp: str) -> None:
+        """Atomically bump the cursor so a crash never corrupts it."""
+        path = self._cursor_path()
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(timestamp)
+        os.replace(tmp, path)
+
+    def iter_new_rejections(self, since_ts: Optional[str] = None):
+        """
+        Yield rejected entries newer than since_ts, oldest first.
+        ISO timestamps compare correctly as strings.
+
+        JSONL logs are walked backwards from the tail and the walk stops
+        at the first entry at or before the cursor, so only the new tail
+        is ever read — never the whole file. Legacy array logs fall back
+        to a parse bounded to the trailing MAX_SCAN_DEPTH entries.
+        """
+        if self.logs_path.endswith('.jsonl'):
+            # Fastest path: seek through the rejection index
+            new = self._new_rejections_from_index(since_ts)
+            if new is None:
+                new = []
+                for entry in self._iter_logs_reverse():
+                    ts = entry.get('timestamp')
+                    if since_ts and ts and ts <= since_ts:
+                        break
+                    if entry.get('user_feedback') == 'Rejected':
+                        new.append(entry)
+                new.reverse()
+            yield from new
+            return
+
+        logs = self.load_json(self.logs_path)
+        if not logs or not isinstance(logs, list):
+            return
+        for entry in logs[-self.MAX_SCAN_DEPTH:]:
+            if entry.get('user_feedback') != 'Rejected':
+                continue
+            ts = entry.get('timestamp')
+            if since_ts and ts and ts <= since_ts:
+                continue
+            yield entry
+
     def process_rejection(self) -> bool:
         """
-        Process the latest rejection and adjust thresholds accordingly.
-        
+        Drain every unprocessed rejection (tracked by a cursor file) and
+        adjust thresholds in-memory; the caller saves once afterwards.
+
         Returns:
             bool: True if adjustments were made, False otherwise
         """
-        # Check for rejection
-        rejection = self.find_latest_rejection()
-        if not rejection:
-            print("No rejected feedback found in interaction logs.")
+        cursor_ts = self._read_cursor()
+        rejections = list(self.iter_new_rejections(cursor_ts))
+        if not rejections:
+            print("No new rejected feedback found in interaction logs.")
             return False
-        
+
+        adjustments_made = False
+        last_ts = cursor_ts
+        for rejection in rejections:
+            if not self._process_single_rejection(rejection):
+                # Leave the cursor before this entry so it is retried on
+                # the next run instead of being consumed and lost
+                break
+            adjustments_made = True
+            ts = rejection.get('timestamp')
+            if ts:
+                last_ts = ts
+
+        if last_ts != cursor_ts:
+            self._write_cursor(last_ts)
+
+        return adjustments_made
+
+    def _process_single_rejection(self, rejection: Dict) -> bool:
+        """Adjust thresholds for one rejected alert (in-memory only)."""
         print(f"\n📋 Found rejection at: {rejection.get('timestamp')}")
-        
-        # Get alert context
-        alert_context = self.get_alert_context()
+
+        # Use the trace embedded in the rejection only when it actually
+        # looks like a decision trace — the explainer logs the
+        # recommendation payload under input_trace, which has none of the
+        # fields the adjustment needs — otherwise fall back to the shared
+        # post-decision trace file
+        alert_context = rejection.get('input_trace')
+        if not (isinstance(alert_context, dict)
+                and alert_context.get('component_id')
+                and alert_context.get('rules_triggered')):
+            alert_context = self.get_alert_context()
         if not alert_context:
             print("Error: Could not load alert context.")
             return False
-        
+
         component_id = alert_context.get('component_id')
         rules_triggered = alert_context.get('rules_triggered', [])
         reasoning_trace = alert_context.get('reasoning_trace', [])
@@ -136,60 +347,82 @@ class ThresholdAdjuster:
         print(f"📊 Component: {component_id}")
         print(f"🔥 Rules triggered: {', '.join(rules_triggered)}")
         
-        # Process each triggered rule
-        adjustments_made = False
+        # Validate and project each step exactly once: every field is
+        # pulled out of the dict a single time here, so the math and print
+        # loops below work on plain tuples instead of re-running .get chains
+        valid_steps = []
         for step in reasoning_trace:
             rule_name = step.get('rule')
             feature_value = step.get('feature_value')
             old_threshold = step.get('threshold')
-            
-            if not all([rule_name, feature_value is not None, old_threshold is not None]):
-                continue
-            
-            # Calculate new threshold
-            new_threshold = self.calculate_new_threshold(old_threshold, feature_value)
-            
-            print(f"\n🔧 Adjusting {rule_name}:")
-            print(f"   Feature value (rejected): {feature_value}")
-            print(f"   Old threshold: {old_threshold}")
-            print(f"   New threshold: {new_threshold} (+{((new_threshold/old_threshold - 1) * 100):.1f}%)")
-            
+            if rule_name and feature_value is not None and old_threshold is not None:
+                valid_steps.append((rule_name, step.get('feature'), feature_value, old_threshold))
+
+        if np is not None and len(valid_steps) > 1:
+            olds = np.fromiter((s[3] for s in valid_steps), dtype=np.float64)
+            feats = np.fromiter((s[2] for s in valid_steps), dtype=np.float64)
+            # Mirror the scalar path's cap warning so the output doesn't
+            # depend on which path happened to run
+            for capped in feats * (1 + SAFETY_MARGIN) > olds * (1 + MAX_INCREASE_RATIO):
+                if capped:
+                    print(f"  ⚠ Capping threshold increase at 50% of original value")
+            new_thresholds = _compute_new_thresholds(olds, feats).tolist()
+        else:
+            new_thresholds = [
+                self.calculate_new_threshold(s[3], s[2])
+                for s in valid_steps
+            ]
+
+        # Process each triggered rule; progress lines are buffered and
+        # flushed in one write after the loop (or skipped when not verbose)
+        adjustments_made = False
+        lines = []
+        # One timestamp for the whole rejection: every adjustment it
+        # produces shares the same logical time, and this keeps the loop
+        # free of per-iteration datetime construction and formatting
+        ts = datetime.now().isoformat()
+        for (rule_name, feature, feature_value, old_threshold), new_threshold in zip(valid_steps, new_thresholds):
+            if self.verbose:
+                lines.append(f"\n🔧 Adjusting {rule_name}:\n")
+                lines.append(f"   Feature value (rejected): {feature_value}\n")
+                lines.append(f"   Old threshold: {old_threshold}\n")
+                lines.append(f"   New threshold: {new_threshold} (+{((new_threshold/old_threshold - 1) * 100):.1f}%)\n")
+
             # Update the threshold
             success = rules_config.update_threshold(component_id, rule_name, new_threshold)
-            
+
             if success:
                 # Record adjustment for audit trail
                 self.adjustments.append({
                     "rule": rule_name,
                     "component": component_id,
-                    "feature": step.get('feature'),
+                    "feature": feature,
                     "old_threshold": old_threshold,
                     "new_threshold": new_threshold,
                     "rejected_value": feature_value,
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": ts,
                     "reason": "User rejected alert - value now considered normal"
                 })
                 adjustments_made = True
-                print(f"   ✅ Threshold updated successfully")
-            else:
-                print(f"   ❌ Failed to update threshold")
+                if self.verbose:
+                    lines.append("   ✅ Threshold updated successfully\n")
+            elif self.verbose:
+                lines.append("   ❌ Failed to update threshold\n")
+
+        if lines:
+            sys.stdout.write(''.join(lines))
         
         return adjustments_made
     
     def save_changes(self) -> bool:
         """
-        Save the updated thresholds back to rules_config.py.
-        
+        Persist the updated thresholds to the overrides sidecar.
+
         Returns:
             bool: True if save was successful
         """
-        config_path = os.path.join(
-            os.path.dirname(__file__),
-            'rules_config.py'
-        )
-        
-        print(f"\n💾 Saving changes to {config_path}...")
-        success = rules_config.save_rules_to_file(config_path)
+        print("\n💾 Saving changes to rules_overrides.json...")
+        success = rules_config.save_rules_to_file()
         
         if success:
             print("✅ Rules configuration updated successfully")
@@ -208,19 +441,88 @@ class ThresholdAdjuster:
         return self.adjustments
 
 
-def main():
-    """Main execution function."""
-    # Determine paths relative to script location
+def migrate_legacy_logs(json_path: str, jsonl_path: str) -> bool:
+    """
+    One-shot migration: rewrite the legacy JSON-array log as JSON Lines.
+
+    Returns:
+        bool: True if a migration happened
+    """
+    if os.path.exists(jsonl_path) or not os.path.exists(json_path):
+        return False
+    try:
+        with open(json_path, 'rb') as f:
+            data = f.read()
+        entries = orjson.loads(data) if orjson else json.loads(data)
+    except (OSError, ValueError) as e:
+        print(f"Error: could not migrate {json_path}: {e}")
+        return False
+    with open(jsonl_path, 'wb') as f:
+        for entry in entries:
+            blob = orjson.dumps(entry) if orjson else json.dumps(entry).encode()
+            f.write(blob + b"\n")
+    print(f"✅ Migrated {len(entries)} log entries to {jsonl_path}")
+    return True
+
+
+def _default_paths():
+    """Resolve the trace/log paths relative to this file."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
-    
+
     trace_path = os.path.join(project_root, '..', 'mt-llm', 'knowledge_base', 'post_decision_trace.json')
-    logs_path = os.path.join(project_root, '..', 'mt-llm', 'interaction_logs.json')
-    
-    # Normalize paths
-    trace_path = os.path.normpath(trace_path)
-    logs_path = os.path.normpath(logs_path)
-    
+    logs_path = os.path.join(project_root, '..', 'mt-llm', 'interaction_logs.jsonl')
+    legacy_logs_path = os.path.join(project_root, '..', 'mt-llm', 'interaction_logs.json')
+
+    return (
+        os.path.normpath(trace_path),
+        os.path.normpath(logs_path),
+        os.path.normpath(legacy_logs_path),
+    )
+
+
+def watch(poll_seconds: float = 2.0):
+    """
+    Long-running mode: poll the interaction log's mtime and run the
+    adjuster in-process on every change. Keeps rules_config's in-memory
+    dict (and the import machinery) hot instead of paying interpreter
+    startup per rejection.
+    """
+    import time
+
+    trace_path, logs_path, legacy_logs_path = _default_paths()
+    migrate_legacy_logs(legacy_logs_path, logs_path)
+
+    print(f"👀 Watching {logs_path} (Ctrl+C to stop)")
+    last_mtime = None
+    while True:
+        try:
+            mtime = os.stat(logs_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime != last_mtime:
+            last_mtime = mtime
+            run_once(trace_path, logs_path)
+        time.sleep(poll_seconds)
+
+
+def main():
+    """Main execution function."""
+    trace_path, logs_path, legacy_logs_path = _default_paths()
+
+    # The explainer appends to the JSONL log; pick up any old array log once
+    migrate_legacy_logs(legacy_logs_path, logs_path)
+
+    return run_once(trace_path, logs_path)
+
+
+def run_once(trace_path: str, logs_path: str):
+    """
+    Process the latest rejection and persist any adjustments. Reusable
+    from drivers/watchers without re-importing anything.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
     print("=" * 60)
     print("THRESHOLD ADJUSTER - Processing User Feedback")
     print("=" * 60)
@@ -234,15 +536,27 @@ def main():
     if adjustments_made:
         # Save changes to rules_config.py
         if adjuster.save_changes():
-            # Output audit trail
+            # Output audit trail: serialize once, write the same bytes to
+            # both stdout and the audit file
             audit_data = adjuster.get_audit_data()
+            if orjson:
+                buf = orjson.dumps(audit_data, option=orjson.OPT_INDENT_2)
+            else:
+                buf = json.dumps(audit_data, indent=2).encode()
+
             print(f"\n📝 Audit Trail ({len(audit_data)} adjustments):")
-            print(json.dumps(audit_data, indent=2))
-            
-            # Save audit trail to a file for reference
+            sys.stdout.flush()
+            sys.stdout.buffer.write(buf)
+            sys.stdout.buffer.write(b'\n')
+
+            # One write syscall plus fsync for durability
             audit_path = os.path.join(script_dir, 'threshold_adjustments.json')
-            with open(audit_path, 'w') as f:
-                json.dump(audit_data, f, indent=2)
+            fd = os.open(audit_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.write(fd, buf)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
             print(f"\n📄 Audit trail saved to: {audit_path}")
             
             return audit_data
@@ -255,4 +569,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if "--watch" in sys.argv:
+        watch()
+    else:
+        main()
@@ -1,34 +1,24 @@
+from bisect import bisect_right
 from datetime import datetime
 
-from rules.rules_config import RULES
+from rules.rules_config import RULES, compile_rules
 from trace_engine.trace_context import start_trace, end_trace
 from trace_engine.trace_step import trace_step
 from trace_engine.trace_persistence import save_trace
 
 
+# Confidence -> decision ladder (kept sorted for bisect lookup):
+# < 0.1 NORMAL, >= 0.1 BORDERLINE, >= 0.7 DANGER
+_DECISION_THRESHOLDS = (0.1, 0.7)
+_DECISION_LABELS = ("NORMAL", "BORDERLINE", "DANGER")
+
+
 class RuleEngine:
     def __init__(self):
         pass
 
-    def _compare(self, value, comparison, threshold):
-        if comparison == ">":
-            return value > threshold
-        elif comparison == ">=":
-            return value >= threshold
-        elif comparison == "<":
-            return value < threshold
-        elif comparison == "<=":
-            return value <= threshold
-        else:
-            raise ValueError(f"Unsupported comparison operator: {comparison}")
-
     def _decision_from_confidence(self, confidence):
-        if confidence >= 0.7:
-            return "DANGER"
-        elif confidence >= 0.1:
-            return "BORDERLINE"
-        else:
-            return "NORMAL"
+        return _DECISION_LABELS[bisect_right(_DECISION_THRESHOLDS, confidence)]
 
     def evaluate(self, record: dict):
         """
@@ -43,8 +33,8 @@ class RuleEngine:
         component = record["component"]
         features = record["features"]
 
-        rules = RULES.get(component, [])
-        if not rules:
+        evaluator = compile_rules(component)
+        if evaluator is None:
             raise ValueError(f"No rules defined for component: {component}")
 
         # ---- START TRACE ----
@@ -54,37 +44,29 @@ class RuleEngine:
         step_id = 1
 
         # ---- RULE EVALUATION ----
-        for rule in rules:
+        # The compiled evaluator does all the compares in one specialized
+        # function; only fired rules come back for trace bookkeeping.
+        component_rules = RULES[component]
+        for rule_name, confidence_delta in evaluator(features):
+            rule = component_rules[rule_name]
             feature_name = rule["feature"]
-            feature_value = features.get(feature_name)
-
-            # If feature missing, skip rule safely
-            if feature_value is None:
-                continue
-
-            fired = self._compare(
-                feature_value,
-                rule["comparison"],
-                rule["threshold"]
-            )
-
-            if fired:
-                confidence += rule["confidence_delta"]
-                confidence = min(confidence, 1.0)
-
-                trace_step({
-                    "step_id": step_id,
-                    "rule": rule["rule"],
-                    "feature": feature_name,
-                    "feature_value": feature_value,
-                    "threshold": rule["threshold"],
-                    "comparison": rule["comparison"],
-                    "rule_result": "FIRED",
-                    "confidence_after_step": round(confidence, 2),
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-
-                step_id += 1
+
+            confidence += confidence_delta
+            confidence = min(confidence, 1.0)
+
+            trace_step({
+                "step_id": step_id,
+                "rule": rule_name,
+                "feature": feature_name,
+                "feature_value": features.get(feature_name),
+                "threshold": rule["threshold"],
+                "comparison": rule["comparison"],
+                "rule_result": "FIRED",
+                "confidence_after_step": round(confidence, 2),
+                "timestamp": datetime.utcnow().isoformat()
+            })
+
+            step_id += 1
 
         # ---- FINAL DECISION ----
         decision = self._decision_from_confidence(confidence)